@@ -1,24 +1,46 @@
 import os
-import json
-from datetime import datetime, timedelta
+import gzip
+import hashlib
+import mmap
+import asyncio
 from pathlib import Path
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from typing import Optional
-from collections import defaultdict
 
+import orjson
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from dotenv import load_dotenv
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 
 from app.services.threat_feed import ThreatFeedService
-from app.services.security_calculator import SecurityCalculator, AssessmentResponse
+from app.services.security_calculator import SecurityCalculator, AssessmentResponse, AssessmentResult
 from app.services.tools_directory import ToolsDirectoryService
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="Daily Risk Digest")
+# Shared services
+calculator = SecurityCalculator()
+threat_service = ThreatFeedService()
+tools_service = ToolsDirectoryService()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Release the threat feed's pooled HTTP connections on shutdown."""
+    yield
+    await threat_service.close()
+
+
+app = FastAPI(
+    title="Daily Risk Digest",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
 
 # Setup paths
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -29,98 +51,251 @@ TEMPLATES_DIR = BASE_DIR / "app" / "templates"
 # Mount static files
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 
-# Setup templates
-templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+# Setup templates. Compiled templates are cached on disk, and production
+# skips the per-render freshness check on the template files.
+templates = Jinja2Templates(
+    env=Environment(
+        loader=FileSystemLoader(str(TEMPLATES_DIR)),
+        autoescape=True,
+        bytecode_cache=FileSystemBytecodeCache(),
+        auto_reload=os.getenv("ENVIRONMENT") != "production"
+    )
+)
+
+
+@lru_cache(maxsize=512)
+def _load_json(path: str, mtime_ns: int):
+    """Parse a JSON file. Keyed on mtime so a rewritten file is re-read."""
+    # Parse straight from the page cache instead of copying into a bytes object
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as view:
+            return orjson.loads(view)
 
 
 def load_index() -> list:
     """Load the digest index file."""
     index_file = DIGESTS_DIR / "index.json"
-    if not index_file.exists():
-        return []
     try:
-        with open(index_file, "r") as f:
-            return json.load(f)
-    except Exception:
+        return _load_json(str(index_file), index_file.stat().st_mtime_ns)
+    except (OSError, ValueError):
         return []
 
 
 def load_digest(date: str) -> Optional[dict]:
     """Load a specific digest by date."""
     digest_file = DIGESTS_DIR / f"{date}.json"
-    if not digest_file.exists():
+    try:
+        return _load_json(str(digest_file), digest_file.stat().st_mtime_ns)
+    except (OSError, ValueError):
         return None
+
+
+@lru_cache(maxsize=1)
+def _build_headlines(index_mtime_ns: Optional[int]) -> dict:
+    """Build the date -> headline map from the indexed digests."""
+    headlines = {}
+    for date in load_index():
+        digest = load_digest(date)
+        if digest:
+            headlines[date] = digest.get("headline", "")
+    return headlines
+
+
+def load_headlines() -> dict:
+    """Load the date -> headline map written by the digest generator."""
+    headlines_file = DIGESTS_DIR / "headlines.json"
     try:
-        with open(digest_file, "r") as f:
-            return json.load(f)
-    except Exception:
+        return _load_json(str(headlines_file), headlines_file.stat().st_mtime_ns)
+    except (OSError, ValueError):
+        # The generator owns headlines.json; until it exists, build the map
+        # in memory, once per version of the index
+        return _build_headlines(_mtime_ns(DIGESTS_DIR / "index.json"))
+
+
+def _mtime_ns(path: Path) -> Optional[int]:
+    """Return a file's mtime in nanoseconds, or None if it is missing."""
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
         return None
 
 
+# Rendered HTML pages: key -> (version, html bytes, gzipped html bytes)
+_page_cache: dict = {}
+
+
+def _render_page(key: str, version, template_name: str, context: dict) -> tuple:
+    """Render a template once per version and keep the plain and gzipped bytes."""
+    html = templates.get_template(template_name).render(context).encode("utf-8")
+    entry = (version, html, gzip.compress(html, 5))
+    _page_cache[key] = entry
+    return entry
+
+
+def _cached_page(key: str, version) -> Optional[tuple]:
+    """Return the cached render for key if it was built from this version."""
+    entry = _page_cache.get(key)
+    if entry is not None and entry[0] == version:
+        return entry
+    return None
+
+
+def _page_response(request: Request, entry: tuple, headers: Optional[dict] = None) -> Response:
+    """Serve a cached page, gzipped when the client accepts it."""
+    headers = {**(headers or {}), "Vary": "Accept-Encoding"}
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return HTMLResponse(content=entry[2], headers=headers)
+    return HTMLResponse(content=entry[1], headers=headers)
+
+
+@lru_cache(maxsize=512)
+def _hash_file(path: str, mtime_ns: int) -> str:
+    """Hash a file's content. Keyed on mtime so a rewritten file is re-hashed."""
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+def _digest_cache_headers(*files: Path) -> Optional[dict]:
+    """Caching headers for a dated digest, or None if one of its files is missing.
+
+    The ETag is derived from the content of the files the response is built
+    from, so it survives deploys that reset every file's mtime.
+    """
+    hashes = []
+    for path in files:
+        mtime_ns = _mtime_ns(path)
+        if mtime_ns is None:
+            return None
+        try:
+            hashes.append(_hash_file(str(path), mtime_ns))
+        except OSError:
+            return None
+    return {
+        # Weak, since the HTML page is served in gzip and identity encodings
+        "ETag": f'W/"{"-".join(hashes)}"',
+        "Cache-Control": "public, max-age=86400, immutable"
+    }
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Check the request's If-None-Match header against an ETag."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or etag[2:] in candidates
+
+
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """Home page rendering the latest digest and dashboard stats."""
-    index = load_index()
-    latest_digest = None
-    past_digests = []
-
-    if index:
-        latest_date = index[0]
-        latest_digest = load_digest(latest_date)
-        
-        # Load past digests (limit to 5)
-        for date in index[1:6]:
-            digest = load_digest(date)
-            if digest:
-                past_digests.append(digest)
-    
     # Fetch stats for dashboard
-    threat_service = ThreatFeedService()
     cves = await threat_service.fetch_recent_cves(days=30, limit=50)
     total_recent_cves = len(cves)
 
-    return templates.TemplateResponse(
-        "index.html",
-        {
-            "request": request,
-            "latest_digest": latest_digest,
-            "past_digests": past_digests,
-            "has_digests": bool(latest_digest),
-            "total_recent_cves": total_recent_cves
-        }
+    # The page only changes when a digest is published or the CVE count moves
+    version = (
+        _mtime_ns(DIGESTS_DIR / "index.json"),
+        _mtime_ns(DIGESTS_DIR / "headlines.json"),
+        total_recent_cves
     )
+    entry = _cached_page("home", version)
+    if entry is None:
+        index = await asyncio.to_thread(load_index)
+        latest_digest = None
+        past_digests = []
+
+        if index:
+            latest_digest, headlines = await asyncio.gather(
+                asyncio.to_thread(load_digest, index[0]),
+                asyncio.to_thread(load_headlines)
+            )
+
+            # Past digests (limit to 5) only need their headline
+            for date in index[1:6]:
+                if date in headlines:
+                    past_digests.append({"date": date, "headline": headlines[date]})
+                else:
+                    digest = await asyncio.to_thread(load_digest, date)
+                    if digest:
+                        past_digests.append(digest)
+
+        entry = _render_page(
+            "home",
+            version,
+            "index.html",
+            {
+                "request": request,
+                "latest_digest": latest_digest,
+                "past_digests": past_digests,
+                "has_digests": bool(latest_digest),
+                "total_recent_cves": total_recent_cves
+            }
+        )
+
+    return _page_response(request, entry)
 
 
 @app.get("/digest/{date}", response_class=HTMLResponse)
-async def view_digest(request: Request, date: str):
+def view_digest(request: Request, date: str):
     """View a specific digest by date."""
-    digest = load_digest(date)
-    if not digest:
+    digest_file = DIGESTS_DIR / f"{date}.json"
+    version = _mtime_ns(digest_file)
+    # The page changes with the template as well as the digest
+    headers = _digest_cache_headers(digest_file, TEMPLATES_DIR / "digest.html")
+    if version is None or headers is None:
         raise HTTPException(status_code=404, detail="Digest not found")
-    
-    return templates.TemplateResponse(
-        "digest.html",
-        {
-            "request": request,
-            "digest": digest
-        }
-    )
+
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    entry = _cached_page(f"digest:{date}", version)
+    if entry is None:
+        digest = load_digest(date)
+        if not digest:
+            raise HTTPException(status_code=404, detail="Digest not found")
+
+        entry = _render_page(
+            f"digest:{date}",
+            version,
+            "digest.html",
+            {
+                "request": request,
+                "digest": digest
+            }
+        )
+
+    return _page_response(request, entry, headers)
 
 
 @app.get("/api/digests")
-async def api_digests():
+def api_digests():
     """API endpoint returning list of all digest dates."""
-    index = load_index()
-    return JSONResponse(content=index)
+    # index.json is already the response body; serve it without re-encoding
+    try:
+        content = (DIGESTS_DIR / "index.json").read_bytes()
+    except OSError:
+        content = b"[]"
+    return Response(content=content, media_type="application/json")
 
 
 @app.get("/api/digest/{date}")
-async def api_digest(date: str):
+def api_digest(request: Request, date: str):
     """API endpoint returning a specific digest."""
-    digest = load_digest(date)
-    if not digest:
+    digest_file = DIGESTS_DIR / f"{date}.json"
+    headers = _digest_cache_headers(digest_file)
+    if headers is None:
         raise HTTPException(status_code=404, detail="Digest not found")
-    return JSONResponse(content=digest)
+
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        content = digest_file.read_bytes()
+    except OSError:
+        raise HTTPException(status_code=404, detail="Digest not found")
+    return Response(content=content, media_type="application/json", headers=headers)
 
 
 @app.get("/health")
@@ -133,57 +308,12 @@ async def health_check():
 @app.get("/threat-feed", response_class=HTMLResponse)
 async def threat_feed_page(request: Request):
     """Threat feed dashboard with live CVE data."""
-    threat_service = ThreatFeedService()
-    
     # Fetch recent CVEs (match the stats window for consistency)
     cves = await threat_service.fetch_recent_cves(days=30, limit=50)
     
-    # Get severity distribution (calculated from the same service logic, but we want to ensure consistency)
-    # Ideally, we should use the SAME dataset for both.
-    # Let's calculate stats from the fetched CVEs directly to ensure 100% match between table and charts on this page view.
-    
-    severity_counts = defaultdict(int)
-    category_counts = defaultdict(int)
-    
-    categories = {
-        "Web Application": ["xss", "sql injection", "csrf", "web", "http"],
-        "Network": ["network", "protocol", "tcp", "udp", "dns"],
-        "Authentication": ["authentication", "password", "credential", "login"],
-        "Privilege Escalation": ["privilege", "escalation", "root", "admin"],
-        "Code Execution": ["remote code execution", "rce", "execute", "arbitrary code"],
-        "Data Exposure": ["information disclosure", "data leak", "exposure", "sensitive"]
-    }
-    
-    for cve in cves:
-        severity_counts[cve["severity"]] += 1
-        
-        desc = cve["description"].lower()
-        found_category = False
-        for category, keywords in categories.items():
-            if any(keyword in desc for keyword in keywords):
-                category_counts[category] += 1
-                found_category = True
-                break
-        if not found_category:
-            category_counts["Other"] += 1
-            
-    # Format distribution for charts based on THIS dataset
-    severity_dist = {
-        "labels": ["CRITICAL", "HIGH", "MEDIUM", "LOW"],
-        "data": [
-            severity_counts.get("CRITICAL", 0),
-            severity_counts.get("HIGH", 0),
-            severity_counts.get("MEDIUM", 0),
-            severity_counts.get("LOW", 0)
-        ],
-        "percentages": [0, 0, 0, 0], # Calculated in JS or ignored if simple count
-        "total": len(cves)
-    }
-    
-    category_dist = {
-        "labels": list(categories.keys()),
-        "data": [category_counts.get(cat, 0) for cat in categories.keys()]
-    }
+    # Calculate stats from the fetched CVEs directly so the table and charts
+    # on this page view always describe the same dataset
+    severity_dist, category_dist = threat_service.summarize_distributions(cves)
     
     return templates.TemplateResponse(
         "threat_feed.html",
@@ -191,9 +321,9 @@ async def threat_feed_page(request: Request):
             "request": request,
             "cves": cves,
             "total_cves": len(cves),
-            "critical_count": severity_counts.get("CRITICAL", 0),
-            "high_count": severity_counts.get("HIGH", 0),
-            "medium_count": severity_counts.get("MEDIUM", 0),
+            "critical_count": severity_dist["data"][0],
+            "high_count": severity_dist["data"][1],
+            "medium_count": severity_dist["data"][2],
             "severity_distribution": severity_dist,
             "category_distribution": category_dist
         }
@@ -203,32 +333,28 @@ async def threat_feed_page(request: Request):
 @app.get("/api/threats/recent")
 async def api_recent_threats(days: int = 7, limit: int = 50):
     """API endpoint for recent threats."""
-    threat_service = ThreatFeedService()
     cves = await threat_service.fetch_recent_cves(days=days, limit=limit)
-    return JSONResponse(content={"cves": cves, "count": len(cves)})
+    return {"cves": cves, "count": len(cves)}
 
 
 @app.get("/api/threats/severity-distribution")
 async def api_severity_distribution(days: int = 30):
     """API endpoint for severity distribution data."""
-    threat_service = ThreatFeedService()
     distribution = await threat_service.get_severity_distribution(days=days)
-    return JSONResponse(content=distribution)
+    return distribution
 
 
 @app.get("/api/threats/category-distribution")
 async def api_category_distribution(days: int = 30):
     """API endpoint for category distribution data."""
-    threat_service = ThreatFeedService()
     distribution = await threat_service.get_category_distribution(days=days)
-    return JSONResponse(content=distribution)
+    return distribution
 
 
 # Security Calculator Routes
 @app.get("/security-calculator", response_class=HTMLResponse)
-async def security_calculator_page(request: Request):
+def security_calculator_page(request: Request):
     """Security assessment calculator page."""
-    calculator = SecurityCalculator()
     questions = calculator.get_all_questions()
     
     return templates.TemplateResponse(
@@ -240,19 +366,16 @@ async def security_calculator_page(request: Request):
     )
 
 
-@app.post("/api/calculate-score")
-async def calculate_security_score(response: AssessmentResponse):
+@app.post("/api/calculate-score", response_model=AssessmentResult)
+def calculate_security_score(response: AssessmentResponse):
     """Calculate security score based on assessment responses."""
-    calculator = SecurityCalculator()
-    result = calculator.calculate_score(response)
-    return JSONResponse(content=result)
+    return calculator.calculate_score(response)
 
 
 # Tools Directory Routes
 @app.get("/tools", response_class=HTMLResponse)
-async def tools_directory_page(request: Request):
+def tools_directory_page(request: Request):
     """Security tools directory page."""
-    tools_service = ToolsDirectoryService()
     tools = tools_service.get_all_tools()
     categories = tools_service.get_categories()
     
@@ -1,9 +1,19 @@
 """
 Security Calculator Service - Assesses security posture and generates scores
 """
+from bisect import bisect_right
+from operator import itemgetter
 from typing import Dict, List
 from pydantic import BaseModel
 
+# Recommendation priorities, most urgent first
+PRIORITIES = ("HIGH", "MEDIUM", "LOW")
+
+# Minimum score for each grade above F, ascending; GRADES[i] covers the
+# scores from GRADE_CUTOFFS[i - 1] up to (not including) GRADE_CUTOFFS[i]
+GRADE_CUTOFFS = (60, 70, 80, 90)
+GRADES = "FDCBA"
+
 
 class AssessmentResponse(BaseModel):
     """User's assessment responses"""
@@ -12,12 +22,46 @@ class AssessmentResponse(BaseModel):
     company_size: str
 
 
+class AssessmentResult(BaseModel):
+    """Scored assessment with benchmark comparison"""
+    overall_score: float
+    category_scores: Dict[str, float]
+    radar_data: Dict[str, List]
+    benchmark: Dict[str, int]
+    recommendations: List[Dict]
+    grade: str
+
+
 class SecurityCalculator:
     """Service for calculating security scores and benchmarking"""
     
     def __init__(self):
         self.questions = self._load_questions()
         self.benchmarks = self._load_benchmarks()
+        
+        # Precomputed lookups for calculate_score
+        self._total_weights = {
+            category: sum(q["weight"] for q in questions)
+            for category, questions in self.questions.items()
+        }
+        self._qid_weight = {
+            q["id"]: (category, q["weight"])
+            for category, questions in self.questions.items()
+            for q in questions
+        }
+        
+        # Precomputed display names and (HIGH, MEDIUM, LOW) recommendation messages
+        self._category_names = {
+            category: category.replace('_', ' ').title() for category in self.questions
+        }
+        self._messages = {
+            category: (
+                f"Critical gaps in {name}. Immediate action required.",
+                f"Improvement needed in {name}.",
+                f"{name} is well-managed. Continue monitoring."
+            )
+            for category, name in self._category_names.items()
+        }
     
     def _load_questions(self) -> Dict[str, List[Dict]]:
         """Load assessment questions by category"""
@@ -201,24 +245,24 @@ class SecurityCalculator:
             }
         }
     
-    def calculate_score(self, responses: AssessmentResponse) -> Dict:
+    def calculate_score(self, responses: AssessmentResponse) -> AssessmentResult:
         """
         Calculate security score based on responses
         
         Returns:
-            Dictionary with overall score, category scores, and radar chart data
+            AssessmentResult with overall score, category scores, and radar chart data
         """
-        category_scores = {}
+        earned_points = dict.fromkeys(self.questions, 0)
+        qid_weight = self._qid_weight
+        for question_id, answered in responses.answers.items():
+            entry = qid_weight.get(question_id) if answered else None
+            if entry is not None:
+                earned_points[entry[0]] += entry[1]
         
-        for category, questions in self.questions.items():
-            total_weight = sum(q["weight"] for q in questions)
-            earned_points = sum(
-                q["weight"] for q in questions 
-                if responses.answers.get(q["id"], False)
-            )
-            
-            # Calculate percentage score
-            score = round((earned_points / total_weight) * 100, 1) if total_weight > 0 else 0
+        # Calculate percentage score
+        category_scores = {}
+        for category, total_weight in self._total_weights.items():
+            score = round((earned_points[category] / total_weight) * 100, 1) if total_weight > 0 else 0
             category_scores[category] = score
         
         # Calculate overall score (weighted average)
@@ -233,14 +277,14 @@ class SecurityCalculator:
         # Generate recommendations
         recommendations = self._generate_recommendations(category_scores)
         
-        return {
-            "overall_score": overall_score,
-            "category_scores": category_scores,
-            "radar_data": radar_data,
-            "benchmark": benchmark,
-            "recommendations": recommendations,
-            "grade": self._get_grade(overall_score)
-        }
+        return AssessmentResult(
+            overall_score=overall_score,
+            category_scores=category_scores,
+            radar_data=radar_data,
+            benchmark=benchmark,
+            recommendations=recommendations,
+            grade=self._get_grade(overall_score)
+        )
     
     def get_benchmark_data(self, industry: str) -> Dict[str, int]:
         """Get industry benchmark for comparison"""
@@ -274,44 +318,33 @@ class SecurityCalculator:
     
     def _generate_recommendations(self, scores: Dict[str, float]) -> List[Dict]:
         """Generate recommendations based on scores"""
-        recommendations = []
+        ranked = []
         
         for category, score in scores.items():
+            # Rank indexes PRIORITIES and the category's message tuple
             if score < 60:
-                priority = "HIGH"
-                message = f"Critical gaps in {category.replace('_', ' ').title()}. Immediate action required."
+                rank = 0
             elif score < 75:
-                priority = "MEDIUM"
-                message = f"Improvement needed in {category.replace('_', ' ').title()}."
+                rank = 1
             else:
-                priority = "LOW"
-                message = f"{category.replace('_', ' ').title()} is well-managed. Continue monitoring."
+                rank = 2
             
-            recommendations.append({
-                "category": category.replace('_', ' ').title(),
+            ranked.append((rank, {
+                "category": self._category_names[category],
                 "score": score,
-                "priority": priority,
-                "message": message
-            })
+                "priority": PRIORITIES[rank],
+                "message": self._messages[category][rank]
+            }))
         
         # Sort by priority (HIGH first)
-        priority_order = {"HIGH": 0, "MEDIUM": 1, "LOW": 2}
-        recommendations.sort(key=lambda x: priority_order[x["priority"]])
+        ranked.sort(key=itemgetter(0))
+        recommendations = [recommendation for _, recommendation in ranked]
         
         return recommendations
     
     def _get_grade(self, score: float) -> str:
         """Convert score to letter grade"""
-        if score >= 90:
-            return "A"
-        elif score >= 80:
-            return "B"
-        elif score >= 70:
-            return "C"
-        elif score >= 60:
-            return "D"
-        else:
-            return "F"
+        return GRADES[bisect_right(GRADE_CUTOFFS, score)]
     
     def get_all_questions(self) -> Dict[str, List[Dict]]:
         """Return all questions for the assessment"""
@@ -2,10 +2,42 @@
 Threat Feed Service - Fetches and processes security threat intelligence
 """
 import os
+import re
+import asyncio
+import time
+import tempfile
 import httpx
+import orjson
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-from collections import defaultdict
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple
+from collections import OrderedDict, defaultdict
+
+# Bump when the processed CVE dict changes shape to invalidate on-disk caches
+CVE_CACHE_VERSION = 2
+
+# Severities reported in distributions, most severe first
+SEVERITY_LABELS = ("CRITICAL", "HIGH", "MEDIUM", "LOW")
+
+# Threat categories and the description keywords that identify them.
+# The first matching category (in insertion order) wins.
+THREAT_CATEGORIES = {
+    "Web Application": ("xss", "sql injection", "csrf", "web", "http"),
+    "Network": ("network", "protocol", "tcp", "udp", "dns"),
+    "Authentication": ("authentication", "password", "credential", "login"),
+    "Privilege Escalation": ("privilege", "escalation", "root", "admin"),
+    "Code Execution": ("remote code execution", "rce", "execute", "arbitrary code"),
+    "Data Exposure": ("information disclosure", "data leak", "exposure", "sensitive")
+}
+
+# CVE identifiers mentioned in free text, e.g. "CVE-2024-12345"
+CVE_ID_PATTERN = re.compile(r"CVE-\d{4}-\d{4,}")
+
+# One compiled alternation per category, matched against lowercased descriptions
+CATEGORY_PATTERNS = [
+    (category, re.compile("|".join(map(re.escape, keywords))))
+    for category, keywords in THREAT_CATEGORIES.items()
+]
 
 
 class ThreatFeedService:
@@ -14,8 +46,28 @@ class ThreatFeedService:
     def __init__(self):
         self.nvd_api_key = os.getenv("NVD_API_KEY", "")
         self.base_url = "https://services.nvd.nist.gov/rest/json/cves/2.0"
-        self.cache = {}
+        # cache_key -> (time.monotonic() when stored, cves, ETag, Last-Modified),
+        # least recently used first. Expired entries are kept for revalidation.
+        self.cache: "OrderedDict[str, Tuple[float, List[Dict], Optional[str], Optional[str]]]" = OrderedDict()
         self.cache_duration = 3600  # 1 hour cache
+        self.cache_max_entries = 64
+        # On-disk copy of the cache that survives worker restarts and redeploys
+        self.cache_dir = Path(__file__).resolve().parent.parent.parent / "data" / "cve_cache"
+        self._client: Optional[httpx.AsyncClient] = None
+        # cache_key -> in-flight upstream fetch shared by concurrent callers
+        self._inflight: Dict[str, "asyncio.Task[List[Dict]]"] = {}
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared HTTP client, creating it on first use"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=30.0)
+        return self._client
+    
+    async def close(self) -> None:
+        """Close the shared HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     async def fetch_recent_cves(self, days: int = 7, limit: int = 50) -> List[Dict]:
         """
@@ -31,10 +83,29 @@ class ThreatFeedService:
         cache_key = f"recent_cves_{days}_{limit}"
         
         # Check cache
-        if cache_key in self.cache:
-            cached_time, cached_data = self.cache[cache_key]
-            if (datetime.now() - cached_time).seconds < self.cache_duration:
-                return cached_data
+        cached = self.cache.get(cache_key)
+        if cached is not None and time.monotonic() - cached[0] < self.cache_duration:
+            self.cache.move_to_end(cache_key)
+            return cached[1]
+        
+        # Coalesce concurrent misses for the same key into one upstream fetch.
+        # Shielding keeps a cancelled caller from cancelling the shared fetch.
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.create_task(self._fetch_cves(days, limit, cache_key))
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        return await asyncio.shield(task)
+    
+    async def _fetch_cves(self, days: int, limit: int, cache_key: str) -> List[Dict]:
+        """Fetch CVEs from NVD, process them and cache the result under cache_key"""
+        # A cold process starts from the entry an earlier process left on disk
+        if cache_key not in self.cache:
+            disk_entry = await asyncio.to_thread(self._read_disk_cache, cache_key)
+            if disk_entry is not None:
+                self._store_cached(cache_key, *disk_entry)
+                if time.monotonic() - disk_entry[3] < self.cache_duration:
+                    return disk_entry[0]
         
         # Calculate date range
         end_date = datetime.now()
@@ -48,6 +119,15 @@ class ThreatFeedService:
         if self.nvd_api_key:
             headers["apiKey"] = self.nvd_api_key
         
+        # Revalidate an expired entry so an unchanged feed costs a bodiless 304
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            _, _, etag, last_modified = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        
         params = {
             "pubStartDate": pub_start,
             "pubEndDate": pub_end,
@@ -55,136 +135,237 @@ class ThreatFeedService:
         }
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    self.base_url,
-                    params=params,
-                    headers=headers
-                )
-                response.raise_for_status()
-                data = response.json()
+            client = self._get_client()
+            response = await client.get(
+                self.base_url,
+                params=params,
+                headers=headers
+            )
+            if response.status_code == 304 and cached is not None:
+                self._store_cached(cache_key, cached[1], cached[2], cached[3])
+                await asyncio.to_thread(self._write_disk_cache, cache_key, cached[1], cached[2], cached[3])
+                return cached[1]
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+            
+            # Process CVEs
+            cves = []
+            for item in data.get("vulnerabilities", [])[:limit]:
+                cve_data = item.get("cve", {})
+                cve_id = cve_data.get("id", "")
+                
+                # Extract description
+                descriptions = cve_data.get("descriptions", [])
+                description = ""
+                if descriptions:
+                    description = descriptions[0].get("value", "")
+                
+                # Extract CVSS score and severity
+                metrics = cve_data.get("metrics", {})
+                cvss_score = 0.0
+                severity = "UNKNOWN"
+                
+                # Try CVSS v3.1 first, then v3.0, then v2.0
+                for version in ["cvssMetricV31", "cvssMetricV30", "cvssMetricV2"]:
+                    if version in metrics and metrics[version]:
+                        metric = metrics[version][0]
+                        cvss_data = metric.get("cvssData", {})
+                        cvss_score = cvss_data.get("baseScore", 0.0)
+                        severity = cvss_data.get("baseSeverity", metric.get("baseSeverity", "UNKNOWN"))
+                        break
+                
+                # Other CVEs cross-referenced in the description
+                related_cves = self._related_cve_ids(cve_id, description)
                 
-                # Process CVEs
-                cves = []
-                for item in data.get("vulnerabilities", [])[:limit]:
-                    cve_data = item.get("cve", {})
-                    cve_id = cve_data.get("id", "")
-                    
-                    # Extract description
-                    descriptions = cve_data.get("descriptions", [])
-                    description = ""
-                    if descriptions:
-                        description = descriptions[0].get("value", "")
-                    
-                    # Extract CVSS score and severity
-                    metrics = cve_data.get("metrics", {})
-                    cvss_score = 0.0
-                    severity = "UNKNOWN"
-                    
-                    # Try CVSS v3.1 first, then v3.0, then v2.0
-                    for version in ["cvssMetricV31", "cvssMetricV30", "cvssMetricV2"]:
-                        if version in metrics and metrics[version]:
-                            metric = metrics[version][0]
-                            cvss_data = metric.get("cvssData", {})
-                            cvss_score = cvss_data.get("baseScore", 0.0)
-                            severity = cvss_data.get("baseSeverity", metric.get("baseSeverity", "UNKNOWN"))
-                            break
-                    
-                    # Published date
-                    published = cve_data.get("published", "")
-                    
-                    # References
-                    references = []
-                    for ref in cve_data.get("references", [])[:3]:
-                        references.append({
-                            "url": ref.get("url", ""),
-                            "source": ref.get("source", "")
-                        })
-                    
-                    cves.append({
-                        "id": cve_id,
-                        "description": description[:300] + "..." if len(description) > 300 else description,
-                        "cvss_score": cvss_score,
-                        "severity": severity.upper(),
-                        "published": published,
-                        "references": references
+                # Published date
+                published = cve_data.get("published", "")
+                
+                # References
+                references = []
+                for ref in cve_data.get("references", [])[:3]:
+                    references.append({
+                        "url": ref.get("url", ""),
+                        "source": ref.get("source", "")
                     })
                 
-                # Cache results
-                self.cache[cache_key] = (datetime.now(), cves)
-                return cves
+                cves.append({
+                    "id": cve_id,
+                    "description": description[:300] + "..." if len(description) > 300 else description,
+                    "cvss_score": cvss_score,
+                    "severity": severity.upper(),
+                    "published": published,
+                    "references": references,
+                    "related_cves": related_cves
+                })
+            
+            # Cache results
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            self._store_cached(cache_key, cves, etag, last_modified)
+            await asyncio.to_thread(self._write_disk_cache, cache_key, cves, etag, last_modified)
+            return cves
                 
         except Exception as e:
             print(f"Error fetching CVEs: {e}")
             # Return mock data for development/demo
             return self._get_mock_cves(limit)
     
-    async def get_severity_distribution(self, days: int = 30) -> Dict:
+    @staticmethod
+    def _related_cve_ids(cve_id: str, description: str) -> List[str]:
+        """Return the distinct CVE IDs a description mentions, other than its own"""
+        return [
+            related_id
+            for related_id in dict.fromkeys(CVE_ID_PATTERN.findall(description))
+            if related_id != cve_id
+        ]
+    
+    def _store_cached(
+        self,
+        cache_key: str,
+        cves: List[Dict],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        stored_at: Optional[float] = None
+    ) -> None:
+        """Cache CVEs and their HTTP validators, evicting the least recently used entries"""
+        if stored_at is None:
+            stored_at = time.monotonic()
+        self.cache[cache_key] = (stored_at, cves, etag, last_modified)
+        self.cache.move_to_end(cache_key)
+        while len(self.cache) > self.cache_max_entries:
+            self.cache.popitem(last=False)
+    
+    def _disk_cache_path(self, cache_key: str) -> Path:
+        """Path of the on-disk cache entry for cache_key"""
+        return self.cache_dir / f"v{CVE_CACHE_VERSION}-{cache_key}.json"
+    
+    def _read_disk_cache(self, cache_key: str) -> Optional[Tuple[List[Dict], Optional[str], Optional[str], float]]:
         """
-        Get distribution of CVE severities for radar chart
+        Load a cache entry persisted by an earlier process
         
         Returns:
-            Dictionary with severity counts and percentages
+            (cves, etag, last_modified, stored_at) with stored_at on this
+            process's monotonic clock, or None if there is no usable entry
+        """
+        try:
+            with open(self._disk_cache_path(cache_key), "rb") as f:
+                entry = orjson.loads(f.read())
+            age = max(0.0, time.time() - entry["stored_at"])
+            return entry["cves"], entry.get("etag"), entry.get("last_modified"), time.monotonic() - age
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+    
+    def _write_disk_cache(
+        self,
+        cache_key: str,
+        cves: List[Dict],
+        etag: Optional[str],
+        last_modified: Optional[str]
+    ) -> None:
+        """Persist a cache entry, replacing the file atomically"""
+        tmp_path = None
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # A unique temp file per write, so concurrent workers never share one
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".", suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(orjson.dumps({
+                    "stored_at": time.time(),
+                    "cves": cves,
+                    "etag": etag,
+                    "last_modified": last_modified
+                }))
+            os.replace(tmp_path, self._disk_cache_path(cache_key))
+            tmp_path = None
+            self._prune_disk_cache()
+        except OSError as e:
+            print(f"Error writing CVE cache: {e}")
+        finally:
+            if tmp_path is not None:
+                Path(tmp_path).unlink(missing_ok=True)
+    
+    def _prune_disk_cache(self) -> None:
+        """Keep only the cache_max_entries most recently written files on disk"""
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                entries.append((path.stat().st_mtime_ns, path))
+            except OSError:
+                continue  # removed by another worker
+        entries.sort(reverse=True)
+        for _, path in entries[self.cache_max_entries:]:
+            path.unlink(missing_ok=True)
+    
+    async def get_distributions(self, days: int = 30) -> Tuple[Dict, Dict]:
+        """
+        Get severity and category distributions from a single CVE fetch
+        
+        Returns:
+            Tuple of (severity distribution, category distribution)
         """
         cves = await self.fetch_recent_cves(days=days, limit=200)
+        return self.summarize_distributions(cves)
+    
+    def summarize_distributions(self, cves: List[Dict]) -> Tuple[Dict, Dict]:
+        """
+        Build severity and category distributions in one pass over the CVEs
+        Categorizes based on CVE description keywords
         
+        Returns:
+            Tuple of (severity counts and percentages, category data for radar chart)
+        """
         severity_counts = defaultdict(int)
+        category_counts = defaultdict(int)
+        
         for cve in cves:
             severity_counts[cve["severity"]] += 1
+            
+            desc = cve["description"].lower()
+            for category, pattern in CATEGORY_PATTERNS:
+                if pattern.search(desc):
+                    category_counts[category] += 1
+                    break
+            else:
+                category_counts["Other"] += 1
         
         total = len(cves)
+        severity_data = [severity_counts.get(label, 0) for label in SEVERITY_LABELS]
         
-        return {
-            "labels": ["CRITICAL", "HIGH", "MEDIUM", "LOW"],
-            "data": [
-                severity_counts.get("CRITICAL", 0),
-                severity_counts.get("HIGH", 0),
-                severity_counts.get("MEDIUM", 0),
-                severity_counts.get("LOW", 0)
-            ],
+        severity_distribution = {
+            "labels": list(SEVERITY_LABELS),
+            "data": severity_data,
             "percentages": [
-                round(severity_counts.get("CRITICAL", 0) / total * 100, 1) if total > 0 else 0,
-                round(severity_counts.get("HIGH", 0) / total * 100, 1) if total > 0 else 0,
-                round(severity_counts.get("MEDIUM", 0) / total * 100, 1) if total > 0 else 0,
-                round(severity_counts.get("LOW", 0) / total * 100, 1) if total > 0 else 0
+                round(count / total * 100, 1) if total > 0 else 0 for count in severity_data
             ],
             "total": total
         }
+        
+        category_distribution = {
+            "labels": list(THREAT_CATEGORIES),
+            "data": [category_counts.get(cat, 0) for cat in THREAT_CATEGORIES]
+        }
+        
+        return severity_distribution, category_distribution
+    
+    async def get_severity_distribution(self, days: int = 30) -> Dict:
+        """
+        Get distribution of CVE severities for radar chart
+        
+        Returns:
+            Dictionary with severity counts and percentages
+        """
+        severity_distribution, _ = await self.get_distributions(days=days)
+        return severity_distribution
     
     async def get_category_distribution(self, days: int = 30) -> Dict:
         """
         Get threat distribution by category for radar chart
-        Categorizes based on CVE description keywords
         
         Returns:
             Dictionary with category data for radar chart
         """
-        cves = await self.fetch_recent_cves(days=days, limit=200)
-        
-        categories = {
-            "Web Application": ["xss", "sql injection", "csrf", "web", "http"],
-            "Network": ["network", "protocol", "tcp", "udp", "dns"],
-            "Authentication": ["authentication", "password", "credential", "login"],
-            "Privilege Escalation": ["privilege", "escalation", "root", "admin"],
-            "Code Execution": ["remote code execution", "rce", "execute", "arbitrary code"],
-            "Data Exposure": ["information disclosure", "data leak", "exposure", "sensitive"]
-        }
-        
-        category_counts = defaultdict(int)
-        
-        for cve in cves:
-            desc = cve["description"].lower()
-            for category, keywords in categories.items():
-                if any(keyword in desc for keyword in keywords):
-                    category_counts[category] += 1
-                    break
-            else:
-                category_counts["Other"] += 1
-        
-        return {
-            "labels": list(categories.keys()),
-            "data": [category_counts.get(cat, 0) for cat in categories.keys()]
-        }
+        _, category_distribution = await self.get_distributions(days=days)
+        return category_distribution
     
     def _get_mock_cves(self, limit: int = 50) -> List[Dict]:
         """Return mock CVE data for development/demo purposes"""
@@ -251,4 +432,7 @@ class ThreatFeedService:
             }
         ]
         
+        for cve in mock_cves:
+            cve["related_cves"] = self._related_cve_ids(cve["id"], cve["description"])
+        
         return mock_cves[:limit]
@@ -1,6 +1,16 @@
-import json
+import orjson
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, NamedTuple, Optional
+
+
+class _ToolsSnapshot(NamedTuple):
+    """One load of tools.json and the lookups derived from it"""
+    mtime_ns: Optional[int]
+    tools: List[Dict]
+    by_id: Dict[str, Dict]
+    categories: List[str]
+    search_index: List[str]
+
 
 class ToolsDirectoryService:
     """Service for managing security tools directory"""
@@ -8,47 +18,73 @@ class ToolsDirectoryService:
     def __init__(self):
         self.data_dir = Path(__file__).resolve().parent.parent.parent / "data"
         self.tools_file = self.data_dir / "tools.json"
+        # Replaced with a single assignment, so threads sharing this service
+        # always read a consistent snapshot
+        self._cache: Optional[_ToolsSnapshot] = None
         
-    def get_all_tools(self) -> List[Dict]:
-        """Get all tools from the dataset"""
-        if not self.tools_file.exists():
-            return []
+    def _build_cache(self, mtime_ns: Optional[int], tools: List[Dict]) -> _ToolsSnapshot:
+        """Build the snapshot for a freshly loaded tool list and swap it in"""
+        by_id = {}
+        for tool in tools:
+            by_id.setdefault(tool["id"], tool)
+        
+        snapshot = _ToolsSnapshot(
+            mtime_ns=mtime_ns,
+            tools=tools,
+            by_id=by_id,
+            categories=sorted(set(tool["category"] for tool in tools)),
+            # Lowercased name/description/tags per tool, parallel to tools; the
+            # unit separator keeps a search term from matching across fields
+            search_index=[
+                "\x1f".join([tool["name"], tool["description"], *tool.get("tags", [])]).lower()
+                for tool in tools
+            ]
+        )
+        self._cache = snapshot
+        return snapshot
+        
+    def _snapshot(self) -> _ToolsSnapshot:
+        """Return the current snapshot, reloading tools.json if it changed"""
+        try:
+            mtime_ns = self.tools_file.stat().st_mtime_ns
+        except OSError:
+            return self._build_cache(None, [])
+        
+        snapshot = self._cache
+        if snapshot is not None and snapshot.mtime_ns == mtime_ns:
+            return snapshot
             
         try:
-            with open(self.tools_file, "r") as f:
-                return json.load(f)
+            with open(self.tools_file, "rb") as f:
+                tools = orjson.loads(f.read())
         except Exception as e:
             print(f"Error loading tools: {e}")
-            return []
+            return self._build_cache(None, [])
+        
+        return self._build_cache(mtime_ns, tools)
+        
+    def get_all_tools(self) -> List[Dict]:
+        """Get all tools from the dataset"""
+        return self._snapshot().tools
             
     def get_tool_by_id(self, tool_id: str) -> Optional[Dict]:
         """Get a specific tool by ID"""
-        tools = self.get_all_tools()
-        for tool in tools:
-            if tool["id"] == tool_id:
-                return tool
-        return None
+        return self._snapshot().by_id.get(tool_id)
         
     def get_categories(self) -> List[str]:
         """Get list of unique tool categories"""
-        tools = self.get_all_tools()
-        categories = set(tool["category"] for tool in tools)
-        return sorted(list(categories))
+        return list(self._snapshot().categories)
         
     def filter_tools(self, category: Optional[str] = None, search: Optional[str] = None) -> List[Dict]:
         """Filter tools by category and search term"""
-        tools = self.get_all_tools()
+        snapshot = self._snapshot()
+        matches = zip(snapshot.tools, snapshot.search_index)
         
         if category and category != "All":
-            tools = [t for t in tools if t["category"] == category]
+            matches = ((t, haystack) for t, haystack in matches if t["category"] == category)
             
         if search:
             search_lower = search.lower()
-            tools = [
-                t for t in tools 
-                if search_lower in t["name"].lower() 
-                or search_lower in t["description"].lower()
-                or any(search_lower in tag.lower() for tag in t.get("tags", []))
-            ]
+            matches = ((t, haystack) for t, haystack in matches if search_lower in haystack)
             
-        return tools
+        return [t for t, _ in matches]
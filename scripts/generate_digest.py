@@ -4,13 +4,19 @@ Generate a daily risk digest for today's date.
 Uses deterministic seeding based on date to ensure stable output if rerun.
 """
 
+import os
 import json
 import random
 from datetime import datetime
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # the daily workflow runs without installing requirements
+    orjson = None
+
 # Security/VRM themed digest items pool
-DIGEST_POOL = [
+DIGEST_POOL = (
     {
         "type": "tip",
         "title": "Enable DNSSEC for your domain",
@@ -317,9 +323,9 @@ DIGEST_POOL = [
         "why": "Security integrated throughout SDLC is more effective than bolt-on security",
         "fix": "Include threat modeling, security reviews, and testing in each phase"
     }
-]
+)
 
-HEADLINES = [
+HEADLINES = (
     "Strengthen Your Security Posture Today",
     "Essential Security Checks for Modern Apps",
     "Protect Your Infrastructure: Daily Reminders",
@@ -330,21 +336,22 @@ HEADLINES = [
     "Build Resilient Systems: Key Practices",
     "Security Fundamentals for Production Systems",
     "Reduce Risk: Today's Security Priorities"
-]
+)
 
 
 def generate_digest(date_str: str) -> dict:
     """Generate a deterministic digest for the given date."""
-    # Seed random with date for deterministic output
+    # Seed a private generator with the date for deterministic output
     seed = int(date_str.replace("-", ""))
-    random.seed(seed)
+    rng = random.Random(seed)
     
     # Select 5-8 items randomly
-    num_items = random.randint(5, 8)
-    selected_items = random.sample(DIGEST_POOL, num_items)
+    num_items = rng.randint(5, 8)
+    indices = rng.sample(range(len(DIGEST_POOL)), num_items)
+    selected_items = [DIGEST_POOL[i] for i in indices]
     
     # Select headline
-    headline = random.choice(HEADLINES)
+    headline = rng.choice(HEADLINES)
     
     return {
         "date": date_str,
@@ -353,6 +360,42 @@ def generate_digest(date_str: str) -> dict:
     }
 
 
+def write_json(path: Path, data) -> None:
+    """
+    Write data as 2-space indented JSON, using orjson when available.
+    The file is replaced atomically so readers never see a partial write.
+    """
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    if orjson is not None:
+        tmp_path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_headlines(digests_dir: Path, index: list) -> dict:
+    """Load the date -> headline map, rebuilding it from the digests if missing."""
+    headlines_file = digests_dir / "headlines.json"
+    if headlines_file.exists():
+        with open(headlines_file, "r") as f:
+            return json.load(f)
+    
+    headlines = {}
+    for date_str in index:
+        digest_file = digests_dir / f"{date_str}.json"
+        if digest_file.exists():
+            with open(digest_file, "r") as f:
+                headlines[date_str] = json.load(f).get("headline", "")
+    return headlines
+
+
+def write_headlines(digests_dir: Path, headlines: dict) -> None:
+    """Write the date -> headline map, newest date first."""
+    ordered = {date_str: headlines[date_str] for date_str in sorted(headlines, reverse=True)}
+    write_json(digests_dir / "headlines.json", ordered)
+
+
 def main():
     # Get today's date
     today = datetime.now().strftime("%Y-%m-%d")
@@ -375,8 +418,7 @@ def main():
     digest = generate_digest(today)
     
     # Write digest file
-    with open(digest_file, "w") as f:
-        json.dump(digest, f, indent=2)
+    write_json(digest_file, digest)
     print(f"Generated digest for {today}")
     
     # Update index
@@ -387,13 +429,17 @@ def main():
     else:
         index = []
     
-    # Add today to index if not already present
-    if today not in index:
+    # Add today to index if not already present (the index is kept newest first)
+    if not index or index[0] != today:
         index.insert(0, today)  # Add to beginning
-        with open(index_file, "w") as f:
-            json.dump(index, f, indent=2)
+        write_json(index_file, index)
         print(f"Updated index with {today}")
     
+    # Keep the homepage's headline map in step with the index
+    headlines = load_headlines(digests_dir, index)
+    headlines[today] = digest["headline"]
+    write_headlines(digests_dir, headlines)
+    
     return 0
 
 